@@ -1,72 +1,429 @@
-from flask import Flask, render_template, request, jsonify, make_response
+from flask import Flask, render_template, request, jsonify, make_response, send_file, redirect, url_for
 import csv
+import gzip
+import hashlib
+import json
 import re
+import threading
 import xml.etree.ElementTree as ET
+from array import array
 from collections import defaultdict
 from pathlib import Path
 import os
 
+from dedup import blocking_keys, business_key, dedupe_businesses, is_duplicate, merge_group, phone_digits
+
 app = Flask(__name__)
+app.config['USE_X_SENDFILE'] = bool(os.environ.get('USE_X_SENDFILE'))
+
+# Serve state and city pages pre-rendered by build_pages.py while they match the data
+SERVE_PREBUILT_PAGES = bool(os.environ.get('SERVE_PREBUILT_PAGES'))
+BASE_DIR = Path(__file__).resolve().parent
+PREBUILT_DIR = BASE_DIR / 'prebuilt'
+PAGES_MANIFEST = PREBUILT_DIR / 'manifest.json'
+# Base URL prebuilt pages are rendered for (canonical and og:url links);
+# prebuilt pages are neither built nor served without it
+SITE_URL = os.environ.get('SITE_URL', '')
+# Templates prebuilt pages are rendered from
+PREBUILT_TEMPLATES = ('base.html', 'state.html', 'city.html')
+if SERVE_PREBUILT_PAGES and not SITE_URL:
+    print("Warning: SERVE_PREBUILT_PAGES is set without SITE_URL, so prebuilt pages won't be served")
+
+# Expensive renders run at most RENDER_WORKERS at a time; up to
+# RENDER_QUEUE_LIMIT more wait RENDER_QUEUE_TIMEOUT seconds before a 503
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 4))
+RENDER_QUEUE_LIMIT = int(os.environ.get('RENDER_QUEUE_LIMIT', 32))
+RENDER_QUEUE_TIMEOUT = float(os.environ.get('RENDER_QUEUE_TIMEOUT', 10))
 
-# Global data storage
+# Global data storage. These containers are never changed once published:
+# loads and deltas build private copies and swap them in with publish_data(),
+# so requests can iterate them without locking
 businesses_data = []
-states_data = defaultdict(list)
-cities_data = defaultdict(list)
+states_data = {}
+cities_data = {}
+businesses_by_key = {}
+business_aliases = {}
+data_version = ''
 
-def load_data_from_csv():
-    """Load business data from CSV file"""
+# Facet count tables: one bucket per (state, city, ZIP3) with the counts kept
+# in a flat integer array and bucket indexes grouped by state slug
+facet_tables = {'buckets': {}, 'keys': [], 'counts': array('I'), 'state_buckets': {}}
+
+# Serializes loads and deltas
+data_lock = threading.RLock()
+
+# Vendor changes files, re-applied in name order on every load
+CHANGES_DIR = os.environ.get('CHANGES_DIR')
+applied_changes = set()
+loaded_csv_mtime = None
+
+# Prebuilt page bookkeeping
+pages_manifest = {}
+pages_manifest_mtime = None
+pages_build = None
+page_digests = {}
+page_digests_version = None
+
+# Render coordination
+render_slots = threading.BoundedSemaphore(RENDER_WORKERS)
+render_lock = threading.Lock()
+render_waiting = 0
+renders_in_flight = {}
+
+# Navigation bundle for the current data version
+nav_bundle = None
+
+BUSINESS_FIELDS = ('name', 'phone', 'full_address', 'city', 'postal_code', 'state')
+
+def parse_business(row):
+    """Build a business record from a CSV row"""
+    return {
+        'name': (row.get('name') or '').strip(),
+        'phone': format_phone(row.get('phone', '')),
+        'full_address': (row.get('full_address') or '').strip(),
+        'city': (row.get('city') or '').strip(),
+        'postal_code': (row.get('postal_code') or '').strip(),
+        'state': (row.get('state') or '').strip()
+    }
+
+def new_data():
+    """Empty set of in-memory indexes"""
+    return {
+        'businesses': [],
+        'states': {},
+        'cities': {},
+        'by_key': {},
+        'aliases': {},
+        'facets': {'buckets': {}, 'keys': [], 'counts': array('I'), 'state_buckets': {}}
+    }
+
+def copy_data():
+    """Copy the published indexes so an update can change them privately.
+    
+    The per-key lists are still shared with the published data, so callers
+    must replace a list before appending to it.
+    """
+    facets = facet_tables
+    return {
+        'businesses': businesses_data,
+        'states': dict(states_data),
+        'cities': dict(cities_data),
+        'by_key': dict(businesses_by_key),
+        'aliases': dict(business_aliases),
+        'facets': {
+            'buckets': dict(facets['buckets']),
+            'keys': list(facets['keys']),
+            'counts': array('I', facets['counts']),
+            'state_buckets': {slug: array('I', buckets) for slug, buckets in facets['state_buckets'].items()}
+        }
+    }
+
+def publish_data(data):
+    """Make a fully built set of indexes the one requests read"""
+    global businesses_data, states_data, cities_data, businesses_by_key, business_aliases
+    global facet_tables, data_version, nav_bundle
+    version = page_digest(data['businesses'])[:12]
+    # Built here, once per version, so serving it never waits on a render slot
+    bundle = build_nav_bundle(version, data['states'], data['cities'])
+    businesses_data = data['businesses']
+    states_data = data['states']
+    cities_data = data['cities']
+    businesses_by_key = data['by_key']
+    business_aliases = data['aliases']
+    facet_tables = data['facets']
+    nav_bundle = bundle
+    data_version = version
+
+def add_business(data, business, keys=None):
+    """Add a business to every index in data, under each of its identity keys"""
+    data['businesses'].append(business)
+    
+    # Organize by state
+    data['states'].setdefault(business['state'], []).append(business)
+    
+    # Organize by city (within state)
+    city_key = f"{business['city']}_{business['state']}"
+    data['cities'].setdefault(city_key, []).append(business)
+    
+    # Merged records stay reachable through every source listing's key
+    keys = tuple(keys) if keys else (business_key(business),)
+    for key in keys:
+        data['by_key'].setdefault(key, []).append(business)
+    data['aliases'][id(business)] = keys
+    
+    count_facet(data['facets'], business, 1)
+
+def count_facet(facets, business, delta):
+    """Adjust the facet bucket a business falls into"""
+    postal_code = business['postal_code']
+    zip3 = postal_code[:3] if postal_code[:3].isdigit() else ''
+    key = (business['state'], business['city'], zip3)
+    
+    bucket = facets['buckets'].get(key)
+    if bucket is None:
+        bucket = facets['buckets'][key] = len(facets['keys'])
+        facets['keys'].append(key + (clean_text(business['city']),))
+        facets['counts'].append(0)
+        facets['state_buckets'].setdefault(clean_text(business['state']), array('I')).append(bucket)
+    facets['counts'][bucket] += delta
+
+def page_digest(businesses):
+    """Fingerprint a list of business records"""
+    digest = hashlib.sha1()
+    for business in businesses:
+        digest.update('\x1f'.join(business[field] for field in BUSINESS_FIELDS).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()[:16]
+
+def csv_file_path():
+    """Location of the business CSV"""
     # Check if running on Vercel (production) or local development
     if os.environ.get('VERCEL_ENV'):
         # For Vercel deployment, use the CSV file in the repository
-        csv_file = "LLC Data.csv"
-    else:
-        # Local development - load from CSV
-        csv_file = r"C:\Users\webd5\Downloads\LLC Data.csv"
+        return "LLC Data.csv"
+    # Local development - load from CSV
+    return r"C:\Users\webd5\Downloads\LLC Data.csv"
+
+def load_data_from_csv():
+    """Load business data from CSV file, then re-apply any changes files"""
+    with data_lock:
+        data = new_data()
+        read_csv_into(data)
+        
+        applied_changes.clear()
+        for path in pending_changes_files():
+            apply_changes_file(path, data)
+        
+        publish_data(data)
+
+def read_csv_into(data):
+    """Parse, dedupe and index the business CSV into data"""
+    global loaded_csv_mtime
+    csv_file = csv_file_path()
+    loaded_csv_mtime = None
     
     try:
+        loaded_csv_mtime = os.stat(csv_file).st_mtime
+        
+        rows = []
         with open(csv_file, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             
             for row in reader:
-                business = {
-                    'name': row.get('name', '').strip(),
-                    'phone': format_phone(row.get('phone', '')),
-                    'full_address': row.get('full_address', '').strip(),
-                    'city': row.get('city', '').strip(),
-                    'postal_code': row.get('postal_code', '').strip(),
-                    'state': row.get('state', '').strip()
-                }
+                business = parse_business(row)
                 
                 # Skip if missing essential data
                 if not business['name'] or not business['state']:
                     continue
                 
-                businesses_data.append(business)
-                
-                # Organize by state
-                states_data[business['state']].append(business)
-                
-                # Organize by city (within state)
-                city_key = f"{business['city']}_{business['state']}"
-                cities_data[city_key].append(business)
+                rows.append(business)
+        
+        # Merge duplicate listings before indexing
+        records, stats = dedupe_businesses(rows)
+        for business, keys in records:
+            add_business(data, business, keys)
         
-        print(f"Loaded {len(businesses_data)} businesses")
-        print(f"States: {len(states_data)}")
-        print(f"Cities: {len(cities_data)}")
+        print(f"Merged {stats['merged']} duplicate listings into {stats['duplicate_groups']} businesses "
+              f"({stats['phone_matches']} by phone, {stats['name_matches']} by name)")
+        print(f"Loaded {len(data['businesses'])} businesses")
+        print(f"States: {len(data['states'])}")
+        print(f"Cities: {len(data['cities'])}")
         
     except FileNotFoundError:
         print(f"Error: CSV file not found at {csv_file}")
-        create_sample_data()
+        create_sample_data(data)
     except Exception as e:
         print(f"Error processing CSV: {e}")
-        create_sample_data()
+        data.update(new_data())
+        create_sample_data(data)
     
     # If no data was loaded, create sample data
-    if not businesses_data:
+    if not data['businesses']:
         print("No business data loaded, creating sample data")
-        create_sample_data()
+        create_sample_data(data)
 
-def create_sample_data():
+def apply_delta_from_csv(changes_file, data=None):
+    """Apply a vendor changes file to the loaded data.
+    
+    Each row has an ``action`` column (add, remove or update) plus the usual
+    business columns, and is matched on business_key(). Removing a listing
+    that was merged into a record only drops its key from that record; the
+    record goes once none of its source listings remain. Added listings are
+    merged into a loaded record they duplicate, as at load time. Without
+    ``data`` the published indexes are copied, updated and published again.
+    Returns the state names and city keys whose pages need to be re-rendered.
+    """
+    with data_lock:
+        publish = data is None
+        if publish:
+            data = copy_data()
+        
+        dirty = {'states': set(), 'cities': set()}
+        dropped_keys = set()
+        pending = {}
+        
+        def mark_dirty(business):
+            dirty['states'].add(business['state'])
+            dirty['cities'].add(f"{business['city']}_{business['state']}")
+        
+        # Read the whole file before changing anything
+        with open(changes_file, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            
+            for row in reader:
+                action = (row.get('action') or '').strip().lower()
+                if action not in ('add', 'remove', 'update'):
+                    print(f"Skipping change with unknown action: {action!r}")
+                    continue
+                
+                business = parse_business(row)
+                key = business_key(business)
+                
+                # An update replaces the listing with that identity
+                if action in ('remove', 'update'):
+                    if key in data['by_key']:
+                        dropped_keys.add(key)
+                    pending.pop(key, None)
+                
+                if action in ('add', 'update'):
+                    # Skip if missing essential data
+                    if not business['name'] or not business['state']:
+                        continue
+                    pending.setdefault(key, []).append((business, action == 'update'))
+        
+        # Drop removed listings' keys; a record goes with its last one
+        aliases = data['aliases']
+        removed = {}
+        for key in dropped_keys:
+            for old in data['by_key'].pop(key):
+                aliases[id(old)] = tuple(k for k in aliases[id(old)] if k != key)
+                if not aliases[id(old)]:
+                    removed[id(old)] = old
+                    mark_dirty(old)
+        deleted = len(removed)
+        
+        # Merge added listings into records they duplicate, as read_csv_into()
+        # does, comparing only with the blocks of the states they touch
+        additions = {}
+        replaced = {}
+        blocks = defaultdict(list)
+        indexed_states = set()
+        
+        def index(business):
+            for block in blocking_keys(business):
+                blocks[block].append(business)
+        
+        def current(business):
+            while id(business) in replaced:
+                business = replaced[id(business)][1]
+            return business
+        
+        for key, businesses in pending.items():
+            for business, is_update in businesses:
+                if business['state'] not in indexed_states:
+                    indexed_states.add(business['state'])
+                    for other in data['states'].get(business['state'], []):
+                        if id(other) not in removed:
+                            index(other)
+                
+                matches = list(data['by_key'].get(key, []))
+                for block in blocking_keys(business):
+                    matches += [other for other in blocks[block] if is_duplicate(business, other)]
+                existing = next((m for m in map(current, matches) if id(m) not in removed), None)
+                
+                keys = (key,)
+                if existing is not None:
+                    # An update's values win over the record it lands in
+                    group = [business, existing] if is_update else [existing, business]
+                    if id(existing) in additions:
+                        keys = additions.pop(id(existing))[1] + keys
+                    else:
+                        keys = aliases[id(existing)] + keys
+                        removed[id(existing)] = existing
+                        mark_dirty(existing)
+                    business = merge_group(group)
+                    replaced[id(existing)] = (existing, business)
+                
+                additions[id(business)] = (business, tuple(dict.fromkeys(keys)))
+                index(business)
+                mark_dirty(business)
+        
+        # Replace every list about to change with a private, filtered copy
+        touched_keys = {key for _, keys in additions.values() for key in keys}
+        for business in removed.values():
+            touched_keys.update(aliases.pop(id(business), ()))
+            count_facet(data['facets'], business, -1)
+        for index_name, keys in (('states', dirty['states']), ('cities', dirty['cities']), ('by_key', touched_keys)):
+            for key in keys:
+                data[index_name][key] = [b for b in data[index_name].get(key, []) if id(b) not in removed]
+        data['businesses'] = [b for b in data['businesses'] if id(b) not in removed]
+        
+        for business, keys in additions.values():
+            add_business(data, business, keys)
+        
+        for index_name, keys in (('states', dirty['states']), ('cities', dirty['cities']), ('by_key', touched_keys)):
+            for key in keys:
+                if not data[index_name][key]:
+                    del data[index_name][key]
+        
+        if publish:
+            publish_data(data)
+    
+    added = sum(map(len, pending.values()))
+    print(f"Applied delta: {deleted} removed, {added} added ({len(replaced)} merged into existing listings)")
+    print(f"Dirty pages: {len(dirty['states'])} states, {len(dirty['cities'])} cities")
+    
+    return dirty
+
+def pending_changes_files():
+    """Changes files in CHANGES_DIR that haven't been applied yet, in name order"""
+    if not CHANGES_DIR:
+        return []
+    return sorted(path for path in Path(CHANGES_DIR).glob('*.csv') if path.name not in applied_changes)
+
+def apply_changes_file(path, data=None):
+    """Apply one file from CHANGES_DIR and mark it applied.
+    
+    A file that can't be applied is reported and skipped, and is retried on
+    the next refresh. Returns the dirty pages, or None on error.
+    """
+    try:
+        dirty = apply_delta_from_csv(path, data)
+    except Exception as e:
+        print(f"Error applying changes file {path}: {e}")
+        return None
+    applied_changes.add(path.name)
+    return dirty
+
+def apply_pending_changes():
+    """Apply changes files added to CHANGES_DIR since the last load"""
+    dirty = {'states': set(), 'cities': set()}
+    with data_lock:
+        for path in pending_changes_files():
+            changes = apply_changes_file(path)
+            if changes is None:
+                continue
+            dirty['states'] |= changes['states']
+            dirty['cities'] |= changes['cities']
+        
+        # Keep served prebuilt pages in step with the data they came from
+        if SERVE_PREBUILT_PAGES and SITE_URL and (dirty['states'] or dirty['cities']):
+            build_prebuilt_pages(dirty['states'], dirty['cities'])
+    return dirty
+
+def refresh_data():
+    """Reload everything if the CSV changed, otherwise apply new changes files"""
+    with data_lock:
+        try:
+            mtime = os.stat(csv_file_path()).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != loaded_csv_mtime:
+            load_data_from_csv()
+        else:
+            apply_pending_changes()
+
+def create_sample_data(data):
     """Create sample data for Vercel deployment"""
     sample_businesses = [
         {
@@ -96,21 +453,15 @@ def create_sample_data():
     ]
     
     for business in sample_businesses:
-        businesses_data.append(business)
-        states_data[business['state']].append(business)
-        city_key = f"{business['city']}_{business['state']}"
-        cities_data[city_key].append(business)
+        add_business(data, business)
     
-    print(f"Created {len(businesses_data)} sample businesses")
+    print(f"Created {len(data['businesses'])} sample businesses")
 
 def format_phone(phone):
     """Format phone number for display"""
     if not phone:
         return ""
-    # Remove all non-digits
-    digits = re.sub(r'\D', '', str(phone))
-    if len(digits) == 11 and digits.startswith('1'):
-        digits = digits[1:]
+    digits = phone_digits(phone)
     if len(digits) == 10:
         return f"+1 ({digits[:3]}) {digits[3:6]}-{digits[6:]}"
     return str(phone)
@@ -124,8 +475,308 @@ def clean_text(text):
     cleaned = re.sub(r'\s+', '-', cleaned.strip())
     return cleaned.lower()
 
-# Load data when app starts
-load_data_from_csv()
+def find_state(state_slug):
+    """Return the state name and businesses for a slug, or (None, None)"""
+    # Iterate one published dict so a concurrent update can't split the lookup
+    for name, businesses in states_data.items():
+        if clean_text(name) == state_slug:
+            return name, businesses
+    return None, None
+
+def find_city(city_slug):
+    """Return the first city name, state name and businesses matching a slug"""
+    for city_key, businesses in cities_data.items():
+        city, state = city_key.split('_', 1)
+        if clean_text(city) == city_slug:
+            return city, state, businesses
+    return None, None, None
+
+def load_pages_manifest():
+    """Return the generated pages manifest, re-reading it when the file changes"""
+    global pages_manifest, pages_manifest_mtime
+    try:
+        mtime = PAGES_MANIFEST.stat().st_mtime
+    except FileNotFoundError:
+        pages_manifest, pages_manifest_mtime = {}, None
+        return pages_manifest
+    
+    if mtime != pages_manifest_mtime:
+        try:
+            with open(PAGES_MANIFEST, 'r', encoding='utf-8') as file:
+                pages_manifest = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading pages manifest: {e}")
+            pages_manifest = {}
+        pages_manifest_mtime = mtime
+    return pages_manifest
+
+def render_state_page(state_name, businesses):
+    """Render a state page with the state.html template"""
+    # Group businesses by city
+    cities = defaultdict(list)
+    for business in businesses:
+        if business['city']:
+            cities[business['city']].append(business)
+    
+    # Sort cities by business count
+    sorted_cities = sorted(cities.items(), key=lambda x: len(x[1]), reverse=True)
+    
+    return render_template('state.html', 
+                         state_name=state_name,
+                         businesses=businesses,
+                         cities=sorted_cities)
+
+def render_city_page(city_name, state_name, businesses):
+    """Render a city page with the city.html template"""
+    return render_template('city.html',
+                         city_name=city_name,
+                         state_name=state_name,
+                         businesses=businesses)
+
+def write_atomic(path, content):
+    """Write a file so readers see either the old or the new content"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+def pages_build_fingerprint():
+    """Fingerprint of everything besides the data that prebuilt pages depend on.
+    
+    Covers SITE_URL and the templates, which are only re-read when one of
+    them changes on disk.
+    """
+    global pages_build
+    paths = [Path(app.root_path) / app.template_folder / name for name in PREBUILT_TEMPLATES]
+    stamp = (SITE_URL,) + tuple(path.stat().st_mtime for path in paths)
+    if pages_build is None or pages_build[0] != stamp:
+        digest = hashlib.sha1(SITE_URL.encode('utf-8'))
+        for path in paths:
+            digest.update(b'\x1e')
+            digest.update(path.read_bytes())
+        pages_build = (stamp, digest.hexdigest()[:16])
+    return pages_build[1]
+
+def build_prebuilt_pages(state_names=None, city_keys=None):
+    """Render state and city pages into PREBUILT_DIR with the route templates.
+    
+    Limited to the given state names and city keys when provided, unless the
+    templates or SITE_URL changed since the last build, which rebuilds every
+    page. Each page is resolved by slug exactly as the routes do, and its
+    digest is recorded in the manifest so prebuilt_page() only serves it
+    while it is current. Returns False if SITE_URL isn't set.
+    """
+    if not SITE_URL:
+        print("Error: set SITE_URL before building prebuilt pages")
+        return False
+    
+    build = pages_build_fingerprint()
+    manifest = load_pages_manifest()
+    if manifest.get('build') == build:
+        pages = dict(manifest.get('pages', {}))
+    else:
+        pages = {}
+        state_names = city_keys = None
+    
+    state_slugs = {clean_text(name) for name in (states_data if state_names is None else state_names)}
+    city_slugs = {clean_text(key.split('_', 1)[0]) for key in (cities_data if city_keys is None else city_keys)}
+    built = 0
+    
+    for slug in state_slugs:
+        if not slug:
+            continue
+        page = f"states/{slug}.html"
+        state_name, businesses = find_state(slug)
+        
+        # Drop pages whose state no longer exists
+        if not state_name:
+            (PREBUILT_DIR / page).unlink(missing_ok=True)
+            pages.pop(page, None)
+            continue
+        
+        with app.test_request_context(f"/states/{slug}", base_url=SITE_URL):
+            write_atomic(PREBUILT_DIR / page, render_state_page(state_name, businesses))
+        pages[page] = page_digest(businesses)
+        built += 1
+    
+    for slug in city_slugs:
+        if not slug:
+            continue
+        page = f"cities/{slug}.html"
+        city_name, state_name, businesses = find_city(slug)
+        
+        # Drop pages whose city no longer exists in any state
+        if not city_name or not state_name:
+            (PREBUILT_DIR / page).unlink(missing_ok=True)
+            pages.pop(page, None)
+            continue
+        
+        with app.test_request_context(f"/cities/{slug}", base_url=SITE_URL):
+            write_atomic(PREBUILT_DIR / page, render_city_page(city_name, state_name, businesses))
+        pages[page] = page_digest(businesses)
+        built += 1
+    
+    manifest = {'build': build, 'pages': pages}
+    write_atomic(PAGES_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+    print(f"Prebuilt {built} pages into {PREBUILT_DIR}")
+    return True
+
+def prebuilt_page(page, businesses):
+    """Send a prebuilt page from disk if it was built from the current data.
+    
+    Returns None when the page is missing or stale (built from other data,
+    templates or SITE_URL) so the caller can fall back to rendering the
+    template.
+    """
+    global page_digests_version
+    if not SERVE_PREBUILT_PAGES or not SITE_URL:
+        return None
+    
+    manifest = load_pages_manifest()
+    build = pages_build_fingerprint()
+    expected = manifest.get('pages', {}).get(page)
+    if not expected or manifest.get('build') != build:
+        return None
+    
+    # Digests only change with the data, so compute each one once per version
+    if page_digests_version != data_version:
+        page_digests.clear()
+        page_digests_version = data_version
+    digest = page_digests.get(page)
+    if digest is None:
+        digest = page_digests[page] = page_digest(businesses)
+    
+    path = PREBUILT_DIR / page
+    if digest != expected or not path.is_file():
+        return None
+    
+    # send_file sets Content-Length and hands the file to the server's
+    # file_wrapper (or X-Sendfile) instead of copying it through Python
+    return send_file(path, mimetype='text/html', etag=f"{build}-{digest}", conditional=True, max_age=300)
+
+class RenderOverloaded(Exception):
+    """Raised when the render queue is full and the request should be shed"""
+
+def run_bounded(render):
+    """Run render() once a render slot is free, or raise RenderOverloaded"""
+    global render_waiting
+    with render_lock:
+        if render_waiting >= RENDER_QUEUE_LIMIT:
+            raise RenderOverloaded()
+        render_waiting += 1
+    try:
+        acquired = render_slots.acquire(timeout=RENDER_QUEUE_TIMEOUT)
+    finally:
+        with render_lock:
+            render_waiting -= 1
+    
+    if not acquired:
+        raise RenderOverloaded()
+    try:
+        return render()
+    finally:
+        render_slots.release()
+
+def render_once(key, render):
+    """Run render() for key, sharing the result with concurrent identical requests.
+    
+    The first request for a key does the work inside a render slot; requests
+    for the same key arriving meanwhile wait for its result (or its error)
+    instead of repeating it. Those waiters count toward RENDER_QUEUE_LIMIT
+    and give up after RENDER_QUEUE_TIMEOUT like any queued render.
+    """
+    global render_waiting
+    with render_lock:
+        call = renders_in_flight.get(key)
+        leader = call is None
+        if leader:
+            call = renders_in_flight[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        elif render_waiting >= RENDER_QUEUE_LIMIT:
+            raise RenderOverloaded()
+        else:
+            render_waiting += 1
+    
+    if not leader:
+        try:
+            done = call['done'].wait(RENDER_QUEUE_TIMEOUT)
+        finally:
+            with render_lock:
+                render_waiting -= 1
+        if not done:
+            raise RenderOverloaded()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+    
+    try:
+        call['result'] = run_bounded(render)
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with render_lock:
+            renders_in_flight.pop(key, None)
+        call['done'].set()
+    return call['result']
+
+@app.errorhandler(RenderOverloaded)
+def render_overloaded(error):
+    """Shed load when too many renders are queued"""
+    return "Server busy, please try again shortly", 503, {'Retry-After': '5'}
+
+def build_nav_bundle(version, states, cities):
+    """Build the navigation bundle (top states, top cities, cities per state)"""
+    sorted_states = sorted(states.items(), key=lambda x: len(x[1]), reverse=True)
+    top_states = [{
+        'name': state_name,
+        'slug': clean_text(state_name),
+        'business_count': len(businesses)
+    } for state_name, businesses in sorted_states[:25]]
+    
+    all_cities = []
+    cities_by_state = defaultdict(list)
+    for city_key, businesses in cities.items():
+        city_name, state_name = city_key.split('_', 1)
+        city = {
+            'name': city_name,
+            'state': state_name,
+            'slug': clean_text(city_name),
+            'business_count': len(businesses)
+        }
+        all_cities.append(city)
+        if city_name:
+            cities_by_state[clean_text(state_name)].append(city)
+    
+    top_cities = sorted(all_cities, key=lambda x: x['business_count'], reverse=True)[:25]
+    for cities in cities_by_state.values():
+        cities.sort(key=lambda x: x['business_count'], reverse=True)
+    
+    body = json.dumps({
+        'version': version,
+        'top_states': top_states,
+        'top_cities': top_cities,
+        'cities_by_state': cities_by_state
+    }, separators=(',', ':')).encode('utf-8')
+    
+    return {'version': version, 'body': body, 'gzip': gzip.compress(body, 9)}
+
+def get_nav_bundle():
+    """Return the navigation bundle for the published data"""
+    bundle = nav_bundle
+    if bundle is None:
+        # Nothing published yet (data loading is deferred)
+        bundle = build_nav_bundle(data_version, states_data, cities_data)
+    return bundle
+
+@app.context_processor
+def inject_nav_version():
+    """Expose the navigation bundle version to base.html"""
+    return {'nav_version': data_version}
+
+# Load data when app starts (asgi.py defers this to its executor)
+if not os.environ.get('DEFER_DATA_LOAD'):
+    load_data_from_csv()
 
 @app.route('/')
 def index():
@@ -183,55 +834,30 @@ def states():
 @app.route('/states/<state_slug>')
 def state_page(state_slug):
     """Individual state page"""
-    # Find state by slug
-    state_name = None
-    for name in states_data.keys():
-        if clean_text(name) == state_slug:
-            state_name = name
-            break
-    
+    state_name, businesses = find_state(state_slug)
     if not state_name:
         return "State not found", 404
     
-    businesses = states_data[state_name]
+    response = prebuilt_page(f"states/{state_slug}.html", businesses)
+    if response is not None:
+        return response
     
-    # Group businesses by city
-    cities = defaultdict(list)
-    for business in businesses:
-        if business['city']:
-            cities[business['city']].append(business)
-    
-    # Sort cities by business count
-    sorted_cities = sorted(cities.items(), key=lambda x: len(x[1]), reverse=True)
-    
-    return render_template('state.html', 
-                         state_name=state_name,
-                         businesses=businesses,
-                         cities=sorted_cities)
+    return render_once(('state', state_name, data_version),
+                       lambda: render_state_page(state_name, businesses))
 
 @app.route('/cities/<city_slug>')
 def city_page(city_slug):
     """Individual city page"""
-    # Find city by slug
-    city_name = None
-    state_name = None
-    
-    for city_key, businesses in cities_data.items():
-        city, state = city_key.split('_', 1)
-        if clean_text(city) == city_slug:
-            city_name = city
-            state_name = state
-            break
-    
+    city_name, state_name, businesses = find_city(city_slug)
     if not city_name or not state_name:
         return "City not found", 404
     
-    businesses = cities_data[f"{city_name}_{state_name}"]
+    response = prebuilt_page(f"cities/{city_slug}.html", businesses)
+    if response is not None:
+        return response
     
-    return render_template('city.html',
-                         city_name=city_name,
-                         state_name=state_name,
-                         businesses=businesses)
+    return render_once(('city', city_name, state_name, data_version),
+                       lambda: render_city_page(city_name, state_name, businesses))
 
 @app.route('/about')
 def about():
@@ -295,14 +921,14 @@ def sitemap():
     base_url = request.host_url.rstrip('/')
     
     # Add static pages
-               static_pages = [
-               {'loc': f"{base_url}/", 'priority': '1.0', 'changefreq': 'daily'},
-               {'loc': f"{base_url}/about", 'priority': '0.8', 'changefreq': 'monthly'},
-               {'loc': f"{base_url}/contact", 'priority': '0.8', 'changefreq': 'monthly'},
-               {'loc': f"{base_url}/privacy", 'priority': '0.6', 'changefreq': 'monthly'},
-               {'loc': f"{base_url}/locations", 'priority': '0.9', 'changefreq': 'weekly'},
-               {'loc': f"{base_url}/cost-calculator", 'priority': '0.9', 'changefreq': 'monthly'},
-           ]
+    static_pages = [
+        {'loc': f"{base_url}/", 'priority': '1.0', 'changefreq': 'daily'},
+        {'loc': f"{base_url}/about", 'priority': '0.8', 'changefreq': 'monthly'},
+        {'loc': f"{base_url}/contact", 'priority': '0.8', 'changefreq': 'monthly'},
+        {'loc': f"{base_url}/privacy", 'priority': '0.6', 'changefreq': 'monthly'},
+        {'loc': f"{base_url}/locations", 'priority': '0.9', 'changefreq': 'weekly'},
+        {'loc': f"{base_url}/cost-calculator", 'priority': '0.9', 'changefreq': 'monthly'},
+    ]
     
     for page in static_pages:
         url = ET.SubElement(urlset, 'url')
@@ -394,6 +1020,82 @@ def api_cities():
         })
     return jsonify(result)
 
+@app.route('/api/nav/<version>.json')
+def api_nav(version):
+    """API endpoint for the versioned navigation bundle"""
+    bundle = get_nav_bundle()
+    if version != bundle['version']:
+        return redirect(url_for('api_nav', version=bundle['version']))
+    
+    # The URL changes with the data, so the bundle can be cached forever
+    # Each encoding gets its own strong ETag so a revalidated cache entry
+    # never hands gzip bytes to a client that didn't ask for them
+    if 'gzip' in request.accept_encodings:
+        response = make_response(bundle['gzip'])
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f"{bundle['version']}-gzip")
+    else:
+        response = make_response(bundle['body'])
+        response.set_etag(bundle['version'])
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response.make_conditional(request)
+
+@app.route('/api/facets')
+def api_facets():
+    """API endpoint for business counts grouped by state, city or ZIP3"""
+    by = request.args.get('by', 'state')
+    if by not in ('state', 'city', 'zip3'):
+        return jsonify({'error': "by must be one of 'state', 'city' or 'zip3'"}), 400
+    
+    state_slug = request.args.get('state', '').strip().lower()
+    city_slug = request.args.get('city', '').strip().lower()
+    zip3 = request.args.get('zip3', '').strip()
+    limit = request.args.get('limit', type=int)
+    if 'limit' in request.args and (limit is None or limit < 1):
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    # Read one published set of tables; a state filter narrows the scan
+    facets = facet_tables
+    if state_slug:
+        buckets = facets['state_buckets'].get(state_slug, ())
+    else:
+        buckets = range(len(facets['keys']))
+    
+    counts = defaultdict(int)
+    for bucket in buckets:
+        count = facets['counts'][bucket]
+        if not count:
+            continue
+        state_name, city_name, bucket_zip3, bucket_city_slug = facets['keys'][bucket]
+        if city_slug and bucket_city_slug != city_slug:
+            continue
+        if zip3 and bucket_zip3 != zip3:
+            continue
+        
+        if by == 'state':
+            counts[state_name] += count
+        elif by == 'city':
+            counts[(city_name, state_name)] += count
+        else:
+            counts[bucket_zip3] += count
+    
+    facets = []
+    for value, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]:
+        if by == 'state':
+            facets.append({'name': value, 'slug': clean_text(value), 'business_count': count})
+        elif by == 'city':
+            facets.append({'name': value[0], 'state': value[1], 'slug': clean_text(value[0]), 'business_count': count})
+        else:
+            facets.append({'name': value, 'business_count': count})
+    
+    return jsonify({
+        'by': by,
+        'total': sum(counts.values()),
+        'facets': facets
+    })
+
 @app.route('/search')
 def search():
     """Search functionality"""
@@ -402,15 +1104,18 @@ def search():
     if not query:
         return render_template('search.html', results=[], query='')
     
-    # Search in business names, cities, and states
-    results = []
-    for business in businesses_data:
-        if (query in business['name'].lower() or 
-            query in business['city'].lower() or 
-            query in business['state'].lower()):
-            results.append(business)
+    def render():
+        # Search in business names, cities, and states
+        results = []
+        for business in businesses_data:
+            if (query in business['name'].lower() or 
+                query in business['city'].lower() or 
+                query in business['state'].lower()):
+                results.append(business)
+        
+        return render_template('search.html', results=results, query=query)
     
-    return render_template('search.html', results=results, query=query)
+    return render_once(('search', query, data_version), render)
 
 # For Vercel deployment
 if __name__ == '__main__':
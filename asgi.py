@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+LLC Directory ASGI Entry Point
+Serves the Flask app from an event loop so slow clients don't hold worker threads
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Flask still runs synchronously, but only while it produces response chunks in
+a thread pool; sending those chunks to the client happens on the event loop.
+Data is loaded in the pool at startup; SIGHUP applies new files in CHANGES_DIR
+(or reloads everything if the CSV changed) without pausing requests.
+"""
+
+import asyncio
+import io
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Load the CSV in the executor during startup instead of at import
+os.environ.setdefault('DEFER_DATA_LOAD', '1')
+
+from app import app as flask_app, load_data_from_csv, refresh_data
+
+WORKER_THREADS = int(os.environ.get('ASGI_WORKER_THREADS', 16))
+CHUNK_SIZE = 64 * 1024
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        elif name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    
+    return environ
+
+def start_wsgi(environ):
+    """Call the Flask app, returning its status, headers and body iterator"""
+    started = {}
+    
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+    
+    result = flask_app(environ, start_response)
+    return started['status'], started['headers'], result, iter(result)
+
+def next_block(chunks):
+    """Pull at least CHUNK_SIZE bytes from a WSGI body iterator (b'' at the end)"""
+    block = bytearray()
+    for chunk in chunks:
+        block += chunk
+        if len(block) >= CHUNK_SIZE:
+            break
+    return bytes(block)
+
+class DirectoryASGI:
+    """ASGI application wrapping the Flask app"""
+    
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='directory')
+        self.loaded = False
+        self.ready = None
+        self.reload_lock = None
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+    
+    def setup(self):
+        """Create the asyncio primitives on the running loop"""
+        if self.ready is None:
+            self.ready = asyncio.Event()
+            self.reload_lock = asyncio.Lock()
+    
+    async def load(self, reload=False):
+        """Load (or refresh) the data in the executor.
+        
+        Updates are published with a single swap in app.py, so requests keep
+        being served from the previous data while a refresh runs.
+        """
+        self.setup()
+        async with self.reload_lock:
+            if self.loaded and not reload:
+                return
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, refresh_data if self.loaded else load_data_from_csv)
+            self.loaded = True
+            self.ready.set()
+    
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.load()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                
+                # SIGHUP picks up new changes files without restarting the server
+                try:
+                    asyncio.get_running_loop().add_signal_handler(
+                        signal.SIGHUP, lambda: asyncio.ensure_future(self.load(reload=True)))
+                except (AttributeError, NotImplementedError, RuntimeError):
+                    pass
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def http(self, scope, receive, send):
+        # Servers without lifespan support load on the first request
+        if not self.loaded:
+            await self.load()
+        await self.ready.wait()
+        
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        
+        await self.respond(build_environ(scope, body), send)
+    
+    async def respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        status, headers, result, chunks = await loop.run_in_executor(self.executor, start_wsgi, environ)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            })
+            
+            # Threads only produce blocks; awaiting send() paces slow clients
+            while True:
+                block = await loop.run_in_executor(self.executor, next_block, chunks)
+                if not block:
+                    break
+                for start in range(0, len(block), CHUNK_SIZE):
+                    await send({'type': 'http.response.body', 'body': block[start:start + CHUNK_SIZE], 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+application = DirectoryASGI()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+LLC Directory Prebuilt Pages
+Renders every state and city page with the Flask templates into prebuilt/,
+where the app serves them directly when SERVE_PREBUILT_PAGES is set
+"""
+
+import sys
+
+from app import build_prebuilt_pages
+
+if __name__ == "__main__":
+    print("LLC Directory Prebuilt Pages")
+    print("=" * 40)
+    
+    if not build_prebuilt_pages():
+        sys.exit(1)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+LLC Directory Deduplication
+Merges duplicate business listings that differ only in name, phone or address formatting
+"""
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# Legal-form and filler words that don't distinguish one business from another
+NAME_STOPWORDS = {
+    'llc', 'l', 'c', 'inc', 'incorporated', 'corp', 'corporation', 'co', 'company',
+    'ltd', 'limited', 'pllc', 'pc', 'pa', 'lp', 'llp', 'the', 'and', 'of'
+}
+
+# Spellings of common address words, reduced to the USPS abbreviation
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy',
+    'suite': 'ste', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w'
+}
+
+# Phone blocks with more distinct names than this only compare names sharing an
+# uncommon word, and skip the spelling comparison
+PHONE_BLOCK_FUZZY_LIMIT = 50
+
+def phone_digits(phone):
+    """Reduce a phone number to its national digits"""
+    if not phone:
+        return ""
+    # Remove all non-digits
+    digits = re.sub(r'\D', '', str(phone))
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+def business_key(business):
+    """Stable identity for a business: normalized name, phone digits and postal code"""
+    name = re.sub(r'[^a-z0-9]+', ' ', business['name'].lower()).strip()
+    return f"{name}|{phone_digits(business['phone'])}|{business['postal_code']}"
+
+def name_fingerprint(name):
+    """Order-insensitive fingerprint of a business name without legal suffixes"""
+    tokens = re.sub(r'[^a-z0-9]+', ' ', str(name).lower().replace('&', ' and ')).split()
+    return ' '.join(sorted(set(token for token in tokens if token not in NAME_STOPWORDS)))
+
+def normalize_address(address):
+    """Compare-friendly form of a street address"""
+    tokens = re.sub(r'[^a-z0-9]+', ' ', str(address).lower().replace('#', ' ')).split()
+    return ' '.join(ADDRESS_ABBREVIATIONS.get(token, token) for token in tokens)
+
+def names_match(fingerprint_a, fingerprint_b, fuzzy=True):
+    """Whether two name fingerprints plausibly name the same business"""
+    if not fingerprint_a or not fingerprint_b:
+        return False
+    if fingerprint_a == fingerprint_b:
+        return True
+    
+    # Mostly the same words, e.g. "acme legal" and "acme legal services"
+    tokens_a, tokens_b = set(fingerprint_a.split()), set(fingerprint_b.split())
+    if len(tokens_a & tokens_b) * 2 >= len(tokens_a | tokens_b):
+        return True
+    
+    # Or the same words with small spelling differences, but never different
+    # numbers ("Unit 4 Holdings" is not "Unit 5 Holdings")
+    if not fuzzy or re.sub(r'\D', '', fingerprint_a) != re.sub(r'\D', '', fingerprint_b):
+        return False
+    matcher = SequenceMatcher(None, fingerprint_a, fingerprint_b)
+    return matcher.real_quick_ratio() >= 0.85 and matcher.quick_ratio() >= 0.85 and matcher.ratio() >= 0.85
+
+def contacts_agree(phones_a, addresses_a, phones_b, addresses_b):
+    """Whether two same-name listings (or groups of them) are one business.
+    
+    Takes the sets of phone digits and normalized addresses on each side.
+    Agreeing addresses settle it; otherwise neither the phones nor the
+    addresses may conflict, a missing value being no conflict.
+    """
+    if not addresses_a.isdisjoint(addresses_b):
+        return True
+    return ((not phones_a or not phones_b or not phones_a.isdisjoint(phones_b))
+            and (not addresses_a or not addresses_b))
+
+def blocking_keys(business):
+    """Blocks of candidate duplicates for a listing.
+    
+    Blocks only pair candidates: group_duplicates() still checks the names
+    in phone blocks, and the phones or addresses in name blocks.
+    """
+    postal_code = business['postal_code'][:5]
+    digits = phone_digits(business['phone'])
+    fingerprint = name_fingerprint(business['name'])
+    
+    keys = []
+    if postal_code:
+        if len(digits) == 10:
+            keys.append(('phone', postal_code, digits))
+        if fingerprint:
+            keys.append(('name', postal_code, fingerprint))
+    elif fingerprint:
+        # Without a postal code, the name must agree along with the phone or city
+        if len(digits) == 10:
+            # Same phone and same name: nothing left to check
+            keys.append(('phone+name', digits, fingerprint))
+        else:
+            keys.append(('city+name', business['state'].lower(), business['city'].lower(), fingerprint))
+    return keys
+
+def group_duplicates(businesses):
+    """Group duplicate businesses, in first-seen order.
+    
+    Each record is hashed into a handful of blocks, so grouping is linear in
+    the number of records apart from name comparisons inside phone blocks.
+    Listings sharing a name only merge when their addresses agree, or when
+    neither their phones nor their addresses conflict, so separate branches
+    of a chain stay separate. Returns the groups and the number of merges
+    made through each block type.
+    """
+    parent = list(range(len(businesses)))
+    contacts = [(phone_digits(b['phone']), normalize_address(b['full_address'])) for b in businesses]
+    # Phone numbers and addresses of each group, kept on its root
+    phones = [{digits} if digits else set() for digits, _ in contacts]
+    addresses = [{address} if address else set() for _, address in contacts]
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i, j, kind):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # Keep the earliest record as the root so output order is stable
+            root, child = min(root_i, root_j), max(root_i, root_j)
+            parent[child] = root
+            for values in (phones, addresses):
+                values[root] |= values[child]
+                values[child] = None
+            merges[kind] += 1
+    
+    def listings_agree(i, j):
+        root_i, root_j = find(i), find(j)
+        return contacts_agree(phones[root_i], addresses[root_i], phones[root_j], addresses[root_j])
+    
+    merges = defaultdict(int)
+    first_in_block = {}
+    phone_blocks = defaultdict(lambda: ({}, defaultdict(set)))
+    name_blocks = defaultdict(dict)
+    for i, business in enumerate(businesses):
+        fingerprint = name_fingerprint(business['name'])
+        for key in blocking_keys(business):
+            if key[0] == 'phone':
+                # A shared phone (e.g. a registered agent) is not enough on
+                # its own: merge only with listings whose names also agree
+                members, by_token = phone_blocks[key]
+                fuzzy = len(members) <= PHONE_BLOCK_FUZZY_LIMIT
+                if fuzzy:
+                    candidates = members
+                else:
+                    # Large blocks are mostly unrelated names; only compare
+                    # those sharing a word that is rare within the block
+                    candidates = {fingerprint} & members.keys()
+                    for token in fingerprint.split():
+                        if len(by_token[token]) <= PHONE_BLOCK_FUZZY_LIMIT:
+                            candidates |= by_token[token]
+                for other_fingerprint in candidates:
+                    if names_match(fingerprint, other_fingerprint, fuzzy):
+                        union(i, members[other_fingerprint], 'phone')
+                if fingerprint not in members:
+                    members[fingerprint] = i
+                    for token in fingerprint.split():
+                        by_token[token].add(fingerprint)
+            elif key[0] == 'phone+name':
+                union(i, first_in_block.setdefault(key, i), key[0])
+            else:
+                # A shared name is not enough either: compare with one
+                # listing per distinct phone and address in the block
+                block = name_blocks[key]
+                for j in block.values():
+                    if listings_agree(i, j):
+                        union(i, j, key[0])
+                block.setdefault(contacts[i], i)
+    
+    groups = defaultdict(list)
+    for i, business in enumerate(businesses):
+        groups[find(i)].append(business)
+    return list(groups.values()), merges
+
+def is_duplicate(business_a, business_b):
+    """Whether group_duplicates() would merge two listings on their own"""
+    shared = set(blocking_keys(business_a)) & set(blocking_keys(business_b))
+    for key in shared:
+        if key[0] == 'phone':
+            if names_match(name_fingerprint(business_a['name']), name_fingerprint(business_b['name'])):
+                return True
+        elif key[0] == 'phone+name':
+            return True
+        else:
+            contacts = []
+            for business in (business_a, business_b):
+                digits = phone_digits(business['phone'])
+                address = normalize_address(business['full_address'])
+                contacts += [{digits} if digits else set(), {address} if address else set()]
+            if contacts_agree(*contacts):
+                return True
+    return False
+
+def merge_group(group):
+    """Build the canonical record for a group of duplicate listings"""
+    if len(group) == 1:
+        return group[0]
+    
+    # Start from the most complete listing, then fill any gaps from the rest
+    best = max(group, key=lambda b: (sum(1 for value in b.values() if value), len(b['full_address'])))
+    canonical = dict(best)
+    for business in group:
+        for field, value in business.items():
+            if value and not canonical.get(field):
+                canonical[field] = value
+    return canonical
+
+def dedupe_businesses(businesses):
+    """Merge near-duplicate businesses.
+    
+    Returns ``(canonical, source_keys)`` pairs, where source_keys holds the
+    business_key() of every listing merged into the record, plus merge
+    statistics.
+    """
+    groups, merges = group_duplicates(businesses)
+    records = []
+    for group in groups:
+        canonical = merge_group(group)
+        keys = dict.fromkeys([business_key(canonical)] + [business_key(business) for business in group])
+        records.append((canonical, tuple(keys)))
+    
+    stats = {
+        'input': len(businesses),
+        'output': len(records),
+        'merged': len(businesses) - len(records),
+        'duplicate_groups': sum(1 for group in groups if len(group) > 1),
+        'phone_matches': merges['phone'] + merges['phone+name'],
+        'name_matches': merges['name'] + merges['city+name']
+    }
+    return records, stats
@@ -10,6 +10,8 @@ import re
 from collections import defaultdict
 from pathlib import Path
 
+from dedup import dedupe_businesses, phone_digits
+
 def clean_text(text):
     """Clean and format text for URLs and display"""
     if not text:
@@ -24,10 +26,7 @@ def format_phone(phone):
     """Format phone number for display"""
     if not phone:
         return ""
-    # Remove all non-digits
-    digits = re.sub(r'\D', '', str(phone))
-    if len(digits) == 11 and digits.startswith('1'):
-        digits = digits[1:]
+    digits = phone_digits(phone)
     if len(digits) == 10:
         return f"+1 ({digits[:3]}) {digits[3:6]}-{digits[6:]}"
     return str(phone)
@@ -290,15 +289,73 @@ def create_city_page(city_name, state_name, businesses):
     
     return html
 
-def process_csv_data(csv_file_path):
-    """Process CSV data and generate pages"""
-    # Create directories if they don't exist
+def write_pages(state_businesses, city_businesses, only_states=None, only_cities=None):
+    """Write state and city pages, optionally limited to the given state names and city keys"""
     states_dir = Path("states")
     cities_dir = Path("cities")
     states_dir.mkdir(exist_ok=True)
     cities_dir.mkdir(exist_ok=True)
     
+    state_names = state_businesses.keys() if only_states is None else only_states
+    city_keys = city_businesses.keys() if only_cities is None else only_cities
+    
+    # Generate state pages
+    for state_name in state_names:
+        if not state_name:
+            continue
+        
+        businesses = state_businesses.get(state_name)
+        state_filename = f"states/{clean_text(state_name)}.html"
+        
+        # Drop pages whose state no longer has any businesses
+        if not businesses:
+            if not any(clean_text(name) == clean_text(state_name) for name in state_businesses):
+                Path(state_filename).unlink(missing_ok=True)
+                print(f"Removed state page: {state_filename}")
+            continue
+            
+        # Group businesses by city for this state
+        state_cities = defaultdict(list)
+        for business in businesses:
+            if business['city']:
+                state_cities[business['city']].append(business)
+        
+        # Generate state page
+        state_html = create_state_page(state_name, businesses, state_cities)
+        
+        with open(state_filename, 'w', encoding='utf-8') as f:
+            f.write(state_html)
+        
+        print(f"Generated state page: {state_filename} ({len(businesses)} businesses)")
+    
+    # Generate city pages
+    for city_key in city_keys:
+        city_name, state_name = city_key.split('_', 1)
+        if not city_name or not state_name:
+            continue
+        
+        businesses = city_businesses.get(city_key)
+        city_filename = f"cities/{clean_text(city_name)}.html"
+        
+        # City slugs are shared across states, so only drop unclaimed pages
+        if not businesses:
+            if not any(clean_text(key.split('_', 1)[0]) == clean_text(city_name) for key in city_businesses):
+                Path(city_filename).unlink(missing_ok=True)
+                print(f"Removed city page: {city_filename}")
+            continue
+        
+        # Generate city page
+        city_html = create_city_page(city_name, state_name, businesses)
+        
+        with open(city_filename, 'w', encoding='utf-8') as f:
+            f.write(city_html)
+        
+        print(f"Generated city page: {city_filename} ({len(businesses)} businesses)")
+
+def process_csv_data(csv_file_path):
+    """Process CSV data and generate pages"""
     # Data structures to organize businesses
+    businesses = []
     state_businesses = defaultdict(list)
     city_businesses = defaultdict(list)
     
@@ -321,50 +378,22 @@ def process_csv_data(csv_file_path):
                 if not business['name'] or not business['state']:
                     continue
                 
-                # Organize by state
-                state_businesses[business['state']].append(business)
-                
-                # Organize by city (within state)
-                city_key = f"{business['city']}_{business['state']}"
-                city_businesses[city_key].append(business)
+                businesses.append(business)
         
-        # Generate state pages
-        for state_name, businesses in state_businesses.items():
-            if not state_name:
-                continue
-                
-            # Group businesses by city for this state
-            state_cities = defaultdict(list)
-            for business in businesses:
-                if business['city']:
-                    state_cities[business['city']].append(business)
-            
-            # Generate state page
-            state_html = create_state_page(state_name, businesses, state_cities)
-            state_filename = f"states/{clean_text(state_name)}.html"
-            
-            with open(state_filename, 'w', encoding='utf-8') as f:
-                f.write(state_html)
-            
-            print(f"Generated state page: {state_filename} ({len(businesses)} businesses)")
+        # Merge duplicate listings so each business gets one entry
+        records, stats = dedupe_businesses(businesses)
+        businesses = [business for business, _ in records]
+        print(f"Merged {stats['merged']} duplicate listings into {stats['duplicate_groups']} businesses")
         
-        # Generate city pages
-        for city_key, businesses in city_businesses.items():
-            if not businesses:
-                continue
-                
-            city_name, state_name = city_key.split('_', 1)
-            if not city_name or not state_name:
-                continue
+        for business in businesses:
+            # Organize by state
+            state_businesses[business['state']].append(business)
             
-            # Generate city page
-            city_html = create_city_page(city_name, state_name, businesses)
-            city_filename = f"cities/{clean_text(city_name)}.html"
-            
-            with open(city_filename, 'w', encoding='utf-8') as f:
-                f.write(city_html)
-            
-            print(f"Generated city page: {city_filename} ({len(businesses)} businesses)")
+            # Organize by city (within state)
+            city_key = f"{business['city']}_{business['state']}"
+            city_businesses[city_key].append(business)
+        
+        write_pages(state_businesses, city_businesses)
         
         print(f"\nGeneration complete!")
         print(f"Total states: {len(state_businesses)}")
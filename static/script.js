@@ -73,12 +73,31 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeNavigation();
 });
 
+// Navigation bundle: one immutable, versioned request per dataset
+let navBundlePromise = null;
+
+function loadNavBundle() {
+    const version = document.body.dataset.navVersion;
+    if (!version) return Promise.resolve(null);
+    
+    if (!navBundlePromise) {
+        navBundlePromise = fetch(`/api/nav/${version}.json`)
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.error('Error loading navigation bundle:', error);
+                return null;
+            });
+    }
+    return navBundlePromise;
+}
+
 // Load navigation dropdowns with top 25 states and cities
 async function loadNavigationDropdowns() {
     try {
+        const bundle = await loadNavBundle();
+        
         // Load top states
-        const statesResponse = await fetch('/api/top-states');
-        const states = await statesResponse.json();
+        const states = bundle ? bundle.top_states : await (await fetch('/api/top-states')).json();
         
         const navStateLinks = document.getElementById('navStateLinks');
         if (navStateLinks) {
@@ -91,15 +110,14 @@ async function loadNavigationDropdowns() {
         }
         
         // Load top cities
-        const citiesResponse = await fetch('/api/top-cities');
-        const cities = await citiesResponse.json();
+        const cities = bundle ? bundle.top_cities : await (await fetch('/api/top-cities')).json();
         
         const navCityLinks = document.getElementById('navCityLinks');
         if (navCityLinks) {
             cities.forEach(city => {
                 const link = document.createElement('a');
                 link.href = `/cities/${city.slug}`;
-                link.textContent = `${city.name}, ${city.state}`;
+                link.textContent = city.state ? `${city.name}, ${city.state}` : city.name;
                 navCityLinks.appendChild(link);
             });
         }
@@ -129,6 +147,11 @@ async function loadStates() {
 
 async function loadCities(stateSlug) {
     try {
+        const bundle = await loadNavBundle();
+        if (bundle) {
+            return bundle.cities_by_state[stateSlug] || [];
+        }
+        
         const response = await fetch(`/api/cities/${stateSlug}`);
         const cities = await response.json();
         return cities;